@@ -1,11 +1,48 @@
-import json
+import functools
+import hashlib
 
+import orjson
 import pandas as pd
 from langchain.agents import AgentExecutor, create_openai_functions_agent
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.tools import StructuredTool
 
-from tools.analysis_tools import create_analysis_tools
+from data.data_engineering import dataframe_to_records
+from tools.analysis_tools import create_analysis_tools, dump_analyses
+
+PROMPT_CACHE_KEY = "news_analysis_agent_v1"
+
+# Agent prompts are fixed, so they are compiled once at import
+AGENT_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            """You are a quantitative crypto strategist whose analysis drives institutional investment decisions. Your insights create demonstrable alpha and edge.
+
+        When analyzing Bitcoin news:
+
+        1. PRIORITIZE SIGNAL OVER NOISE
+        - Identify statistically significant market-moving information
+        - Filter out market-neutral events regardless of headline appeal
+        - Quantify information value in terms of trading edge
+
+        2. DELIVER ACTIONABLE INTELLIGENCE
+        - Provide specific price levels for entries, exits, and risk management
+        - Include probability estimates for different scenarios
+        - Specify exact conditions that would trigger position adjustments
+
+        3. DIFFERENTIATE TIME HORIZONS
+        - Separate immediate, short-term, and structural implications
+        - Identify confirmation signals for each time horizon
+        - Provide distinct strategies for different trader profiles
+
+        Your analysis must enable immediate trading decisions with quantifiable risk parameters. Vague or non-specific recommendations are unacceptable.
+        """,
+        ),
+        ("human", "{input}"),
+        ("human", "{agent_scratchpad}"),
+    ]
+)
 
 
 def create_news_analysis_agent(llm, article_analyses, verbose):
@@ -21,96 +58,108 @@ def create_news_analysis_agent(llm, article_analyses, verbose):
         AgentExecutor: Agent for news analysis
     """
 
-    # If article_analyses is a DataFrame, convert it properly
-    if isinstance(article_analyses, pd.DataFrame):
-        # Convert to records and handle date/timestamp conversion
-        analyses_list = json.loads(
-            article_analyses.to_json(orient="records", date_format="iso")
-        )
-    else:
-        # If it's already a dict or list, just ensure it's JSON serializable
-        try:
-            # Test if it can be serialized
-            json.dumps(article_analyses)
-            analyses_list = article_analyses
-        except TypeError:
-            # If not, convert any problematic elements
-            if isinstance(article_analyses, dict):
-                analyses_list = json.loads(
-                    pd.json_normalize(article_analyses).to_json(orient="records")
-                )[0]
-            else:
-                analyses_list = json.loads(
-                    pd.DataFrame(article_analyses).to_json(orient="records")
+    # Records are built on first tool use; an agent that answers without
+    # calling a tool never pays for the conversion
+    @functools.cache
+    def get_analyses_list() -> list:
+        # If article_analyses is a DataFrame, convert it properly
+        if isinstance(article_analyses, pd.DataFrame):
+            # Convert to records and handle date/timestamp conversion
+            return dataframe_to_records(article_analyses)
+        else:
+            # If it's already a dict or list, just ensure it's JSON serializable
+            try:
+                # Test if it can be serialized
+                orjson.dumps(
+                    article_analyses,
+                    option=orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY,
                 )
+                return article_analyses
+            except TypeError:
+                # If not, convert any problematic elements
+                if isinstance(article_analyses, dict):
+                    return orjson.loads(
+                        pd.json_normalize(article_analyses).to_json(orient="records")
+                    )[0]
+                else:
+                    return orjson.loads(
+                        pd.DataFrame(article_analyses).to_json(orient="records")
+                    )
+
+    # Every aggregator embeds the same text, so it is serialized once
+    @functools.cache
+    def get_analyses_text() -> str:
+        return dump_analyses(get_analyses_list())
 
     # Create wrapped tools that include the article analyses
     analysis_tools = create_analysis_tools(llm)
 
-    # Create wrapped tools that include the article analyses
-    def analyze_topics_wrapper(query: str = None):
-        """Analyze trending topics across the provided articles"""
-        return analysis_tools["analyze_topics"].func(analyses_list)
-
-    def analyze_sentiment_wrapper(query: str = None):
-        """Analyze overall sentiment across the provided articles"""
-        return analysis_tools["analyze_sentiment"].func(analyses_list)
-
-    def analyze_market_influence_wrapper(query: str = None):
-        """Analyze how news might influence the market based on provided articles"""
-        return analysis_tools["analyze_market_influence"].func(analyses_list)
+    # Reuse tool results when the agent asks for the same analysis again
+    @functools.cache
+    def get_data_key() -> str:
+        return hashlib.blake2b(get_analyses_text().encode(), digest_size=16).hexdigest()
+
+    # One cache serves the sync and async tools; failed results are not
+    # stored, so the next request fetches them again
+    tool_results = {}
+
+    def run_tool(tool_name: str) -> dict:
+        key = (tool_name, get_data_key())
+        if key not in tool_results:
+            result = analysis_tools[tool_name].func(get_analyses_text())
+            if "error" in result:
+                return result
+            tool_results[key] = result
+        return tool_results[key]
+
+    async def arun_tool(tool_name: str) -> dict:
+        key = (tool_name, get_data_key())
+        if key not in tool_results:
+            result = await analysis_tools[tool_name].coroutine(get_analyses_text())
+            if "error" in result:
+                return result
+            tool_results[key] = result
+        return tool_results[key]
+
+    # Each agent tool runs its analysis tool on the article analyses, through
+    # the shared result cache on both the sync and async paths
+    def wrap_tool(tool_name: str, description: str) -> StructuredTool:
+        def run(query: str = None):
+            return run_tool(tool_name)
+
+        async def arun(query: str = None):
+            return await arun_tool(tool_name)
+
+        return StructuredTool.from_function(
+            func=run, coroutine=arun, name=tool_name, description=description
+        )
 
-    # Create structured tools with the wrappers
     wrapped_tools = [
-        StructuredTool.from_function(
-            func=analyze_topics_wrapper,
-            name="analyze_topics",
-            description="Analyze trending topics across the provided articles",
+        wrap_tool(
+            "analyze_topics",
+            "Analyze trending topics across the provided articles",
         ),
-        StructuredTool.from_function(
-            func=analyze_sentiment_wrapper,
-            name="analyze_sentiment",
-            description="Analyze overall sentiment across the provided articles",
+        wrap_tool(
+            "analyze_sentiment",
+            "Analyze overall sentiment across the provided articles",
         ),
-        StructuredTool.from_function(
-            func=analyze_market_influence_wrapper,
-            name="analyze_market_influence",
-            description="Analyze how news might influence the market based on provided articles",
+        wrap_tool(
+            "analyze_market_influence",
+            "Analyze how news might influence the market based on provided articles",
         ),
     ]
 
-    agent_prompt = ChatPromptTemplate.from_messages(
-        [
-            (
-                "system",
-                """You are a quantitative crypto strategist whose analysis drives institutional investment decisions. Your insights create demonstrable alpha and edge.
-
-        When analyzing Bitcoin news:
-
-        1. PRIORITIZE SIGNAL OVER NOISE
-        - Identify statistically significant market-moving information
-        - Filter out market-neutral events regardless of headline appeal
-        - Quantify information value in terms of trading edge
-
-        2. DELIVER ACTIONABLE INTELLIGENCE
-        - Provide specific price levels for entries, exits, and risk management
-        - Include probability estimates for different scenarios
-        - Specify exact conditions that would trigger position adjustments
-
-        3. DIFFERENTIATE TIME HORIZONS
-        - Separate immediate, short-term, and structural implications
-        - Identify confirmation signals for each time horizon
-        - Provide distinct strategies for different trader profiles
-
-        Your analysis must enable immediate trading decisions with quantifiable risk parameters. Vague or non-specific recommendations are unacceptable.
-        """,
-            ),
-            ("human", "{input}"),
-            ("human", "{agent_scratchpad}"),
-        ]
+    # The system prompt is a fixed prefix on every agent step; a stable cache key
+    # routes those requests to the same OpenAI prompt cache
+    agent = create_openai_functions_agent(
+        llm.bind(prompt_cache_key=PROMPT_CACHE_KEY), wrapped_tools, AGENT_PROMPT
     )
-
-    agent = create_openai_functions_agent(llm, wrapped_tools, agent_prompt)
+    # Intermediate steps let callers tell a clean answer from one built on
+    # tool errors before they store it
     return AgentExecutor(
-        agent=agent, tools=wrapped_tools, verbose=verbose, handle_parsing_errors=True
+        agent=agent,
+        tools=wrapped_tools,
+        verbose=verbose,
+        handle_parsing_errors=True,
+        return_intermediate_steps=True,
     )
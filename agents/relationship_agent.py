@@ -1,12 +1,49 @@
-import json
+import functools
+import hashlib
 
+import orjson
 import pandas as pd
 from langchain.agents import AgentExecutor, create_openai_functions_agent
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.tools import StructuredTool
 
+from data.data_engineering import dataframe_to_records
 from tools.relationship_analysis_tools import create_relationship_analysis_tools
 
+PROMPT_CACHE_KEY = "relationship_analysis_agent_v1"
+
+# Agent prompts are fixed, so they are compiled once at import
+AGENT_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            """You are a quantitative investment analyst specializing in extracting tradable edge from crypto market inefficiencies.
+
+When analyzing news-price relationships:
+
+1. IDENTIFY EXPLOITABLE PATTERNS
+   - Calculate statistical edge (win rate, expected value)
+   - Measure persistence and decay of different signal types
+   - Quantify market overreaction and underreaction scenarios
+
+2. DEVELOP IMPLEMENTATION FRAMEWORK
+   - Specify exact entry/exit execution methodology
+   - Define position sizing model with risk parameters
+   - Provide scenario-based adjustment triggers
+
+3. DELIVER PORTFOLIO-LEVEL INSIGHTS
+   - Translate findings into allocation recommendations
+   - Identify correlation with existing strategies and assets
+   - Provide portfolio-level risk metrics for implementation
+
+Your recommendations must be specific enough to be programmatically implemented and backtested. Include all parameters required for strategy execution.
+        """,
+        ),
+        ("human", "{input}"),
+        ("human", "{agent_scratchpad}"),
+    ]
+)
+
 
 def create_relationship_analysis_agent(llm, merged_df, verbose):
     """
@@ -24,41 +61,67 @@ def create_relationship_analysis_agent(llm, merged_df, verbose):
 
     relationship_analysis_tools = create_relationship_analysis_tools(llm)
 
-    # If article_analyses is a DataFrame, convert it properly
-    if isinstance(merged_df, pd.DataFrame):
-        # Convert to records and handle date/timestamp conversion
-        merged_price_news_data = json.loads(
-            merged_df.to_json(orient="records", date_format="iso")
-        )
-    else:
-        # If it's already a dict or list, just ensure it's JSON serializable
-        try:
-            # Test if it can be serialized
-            json.dumps(merged_df)
-            merged_price_news_data = merged_df
-        except TypeError:
-            # If not, convert any problematic elements
-            if isinstance(merged_df, dict):
-                merged_price_news_data = json.loads(
-                    pd.json_normalize(merged_df).to_json(orient="records")
-                )[0]
-            else:
-                merged_price_news_data = json.loads(
-                    pd.DataFrame(merged_df).to_json(orient="records")
+    # Records are built on first tool use; an agent that answers without
+    # calling a tool never pays for the conversion
+    @functools.cache
+    def get_merged_price_news_data() -> list:
+        # If article_analyses is a DataFrame, convert it properly
+        if isinstance(merged_df, pd.DataFrame):
+            # Convert to records and handle date/timestamp conversion
+            return dataframe_to_records(merged_df)
+        else:
+            # If it's already a dict or list, just ensure it's JSON serializable
+            try:
+                # Test if it can be serialized
+                orjson.dumps(
+                    merged_df,
+                    option=orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY,
                 )
+                return merged_df
+            except TypeError:
+                # If not, convert any problematic elements
+                if isinstance(merged_df, dict):
+                    return orjson.loads(
+                        pd.json_normalize(merged_df).to_json(orient="records")
+                    )[0]
+                else:
+                    return orjson.loads(
+                        pd.DataFrame(merged_df).to_json(orient="records")
+                    )
+
+    # Reuse tool results when the agent asks for the same analysis again
+    @functools.cache
+    def get_data_key() -> str:
+        return hashlib.blake2b(
+            orjson.dumps(
+                get_merged_price_news_data(),
+                option=orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+                default=str,
+            ),
+            digest_size=16,
+        ).hexdigest()
+
+    tool_results = {}
+
+    def run_tool(tool_name: str) -> dict:
+        key = (tool_name, get_data_key())
+        if key not in tool_results:
+            result = relationship_analysis_tools[tool_name].func(
+                get_merged_price_news_data()
+            )
+            if "error" in result:
+                return result
+            tool_results[key] = result
+        return tool_results[key]
 
     # Create wrapped tools that include the article analyses
     def analyze_price_news_correlation_wrapper(query: str = None):
         """Analyze correlation between news and prices"""
-        return relationship_analysis_tools["analyze_price_news_correlation"].func(
-            merged_price_news_data
-        )
+        return run_tool("analyze_price_news_correlation")
 
     def generate_trading_insights_wrapper(query: str = None):
         """Generate trading insights based on the analyzed correlation"""
-        return relationship_analysis_tools["generate_trading_insights"].func(
-            merged_price_news_data
-        )
+        return run_tool("generate_trading_insights")
 
     # Create structured tools with the wrappers
     wrapped_tools = [
@@ -74,38 +137,17 @@ def create_relationship_analysis_agent(llm, merged_df, verbose):
         ),
     ]
 
-    agent_prompt = ChatPromptTemplate.from_messages(
-        [
-            (
-                "system",
-                """You are a quantitative investment analyst specializing in extracting tradable edge from crypto market inefficiencies.
-
-When analyzing news-price relationships:
-
-1. IDENTIFY EXPLOITABLE PATTERNS
-   - Calculate statistical edge (win rate, expected value)
-   - Measure persistence and decay of different signal types
-   - Quantify market overreaction and underreaction scenarios
-
-2. DEVELOP IMPLEMENTATION FRAMEWORK
-   - Specify exact entry/exit execution methodology
-   - Define position sizing model with risk parameters
-   - Provide scenario-based adjustment triggers
-
-3. DELIVER PORTFOLIO-LEVEL INSIGHTS
-   - Translate findings into allocation recommendations
-   - Identify correlation with existing strategies and assets
-   - Provide portfolio-level risk metrics for implementation
-
-Your recommendations must be specific enough to be programmatically implemented and backtested. Include all parameters required for strategy execution.
-        """,
-            ),
-            ("human", "{input}"),
-            ("human", "{agent_scratchpad}"),
-        ]
+    # The system prompt is a fixed prefix on every agent step; a stable cache key
+    # routes those requests to the same OpenAI prompt cache
+    agent = create_openai_functions_agent(
+        llm.bind(prompt_cache_key=PROMPT_CACHE_KEY), wrapped_tools, AGENT_PROMPT
     )
-
-    agent = create_openai_functions_agent(llm, wrapped_tools, agent_prompt)
+    # Intermediate steps let callers tell a clean answer from one built on
+    # tool errors before they store it
     return AgentExecutor(
-        agent=agent, tools=wrapped_tools, verbose=verbose, handle_parsing_errors=True
+        agent=agent,
+        tools=wrapped_tools,
+        verbose=verbose,
+        handle_parsing_errors=True,
+        return_intermediate_steps=True,
     )
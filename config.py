@@ -6,3 +6,13 @@ NEWS_DATA_PATH = "data/datasets/news_btc.csv"
 PRICES_DATA_PATH = "data/datasets/BTCUSDT_1h_from_2019.csv"
 LLM_MODEL = "gpt-4o"
 LLM_TEMPERATURE = 0.0
+LLM_CACHE_PATH = ".llm_cache.db"
+AGENT_CACHE_PATH = ".agent_cache"
+# Set to "false" to always run the agents instead of replaying stored answers
+AGENT_CACHE_ENABLED = os.getenv("AGENT_CACHE_ENABLED", "true").lower() == "true"
+# Max in-flight LLM requests; size to the account's OpenAI RPM/TPM limits
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "32"))
+# Retries with exponential backoff on rate-limit (429) and transient errors
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+# When set, plots are rendered off-screen and saved here instead of shown
+PLOTS_OUTPUT_DIR = os.getenv("PLOTS_OUTPUT_DIR")
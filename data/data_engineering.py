@@ -1,6 +1,36 @@
+import bottleneck as bn
+import numpy as np
 import pandas as pd
 
 
+def _sorted_by_time(df: pd.DataFrame, column: str) -> pd.DataFrame:
+    """
+    Return the dataframe sorted by a datetime64[ns] key, copying only when needed
+
+    Args:
+        df (DataFrame): Input dataframe, left unmodified
+        column (str): Name of the time column
+
+    Returns:
+        DataFrame: Dataframe usable as a merge_asof side
+    """
+    # merge_asof needs both keys at the same resolution
+    key = df[column]
+    if not pd.api.types.is_datetime64_any_dtype(key) or key.dt.unit != "ns":
+        key = pd.to_datetime(key).dt.as_unit("ns")
+        df = df.assign(**{column: key})
+
+    # merge_asof rejects null keys; the previous inner join never matched them
+    if key.hasnans:
+        df = df[key.notna()]
+        key = df[column]
+
+    # Price data arrives sorted from calculate_price_changes
+    if not key.is_monotonic_increasing:
+        df = df.sort_values(column)
+    return df
+
+
 def merge_news_price_data(
     analysis_df: pd.DataFrame, price_df: pd.DataFrame
 ) -> pd.DataFrame:
@@ -14,20 +44,36 @@ def merge_news_price_data(
     Returns:
         DataFrame: Merged dataset
     """
-    # Convert date columns to datetime
-    analysis_df = analysis_df.copy()
-    price_df = price_df.copy()
+    # Match each article to the latest hourly candle at or before it
+    merged_df = pd.merge_asof(
+        _sorted_by_time(analysis_df, "date"),
+        _sorted_by_time(price_df, "timestamp"),
+        left_on="date",
+        right_on="timestamp",
+        direction="backward",
+        tolerance=pd.Timedelta(hours=1),
+    )
 
-    analysis_df["date"] = pd.to_datetime(analysis_df["date"])
-    price_df["timestamp"] = pd.to_datetime(price_df["timestamp"])
+    # Keep only articles inside their candle's hour, as the previous inner join did
+    in_candle = merged_df["date"] - merged_df["timestamp"] < pd.Timedelta(hours=1)
+    return merged_df[in_candle].reset_index(drop=True)
 
-    # Create date keys for merging
-    analysis_df["merge_date"] = analysis_df["date"].dt.floor("H")
-    price_df["merge_date"] = price_df["timestamp"].dt.floor("H")
 
-    # Merge datasets
-    merged_df = pd.merge(analysis_df, price_df, on="merge_date")
-    return merged_df
+def _pct_change(values: np.ndarray, periods: int) -> np.ndarray:
+    """
+    Percentage change over a number of rows, NaN-padded like Series.pct_change
+
+    Args:
+        values (ndarray): Input values, without gaps
+        periods (int): Number of rows to look back
+
+    Returns:
+        ndarray: Percentage change (x100) with the first `periods` entries as NaN
+    """
+    out = np.empty(len(values), dtype=np.promote_types(values.dtype, np.float32))
+    out[:periods] = np.nan
+    out[periods:] = (values[periods:] / values[:-periods] - 1) * 100
+    return out
 
 
 def calculate_price_changes(price_df: pd.DataFrame) -> pd.DataFrame:
@@ -43,14 +89,62 @@ def calculate_price_changes(price_df: pd.DataFrame) -> pd.DataFrame:
     df = price_df.copy()
     df = df.sort_values("timestamp")
 
-    # Calculate price changes
-    df["price_pct_change_1h"] = df["close"].pct_change(1) * 100
-    df["price_pct_change_24h"] = df["close"].pct_change(24) * 100
-    df["price_pct_change_7d"] = df["close"].pct_change(168) * 100
+    # Calculate price changes on the raw close array
+    close = df["close"].to_numpy()
+    df["price_pct_change_1h"] = _pct_change(close, 1)
+    df["price_pct_change_24h"] = _pct_change(close, 24)
+    df["price_pct_change_7d"] = _pct_change(close, 168)
 
-    # Calculate volatility
-    df["volatility_24h"] = (
-        df["high"].rolling(24).max() / df["low"].rolling(24).min() - 1
-    )
+    # Calculate volatility with bottleneck's O(N) moving-window kernels, which
+    # reject windows longer than the data (rolling() gave all-NaN there)
+    if len(df) >= 24:
+        df["volatility_24h"] = (
+            bn.move_max(df["high"].to_numpy(), 24)
+            / bn.move_min(df["low"].to_numpy(), 24)
+            - 1
+        )
+    else:
+        df["volatility_24h"] = np.nan
 
     return df
+
+
+def dataframe_to_records(df: pd.DataFrame) -> list:
+    """
+    Convert a dataframe into JSON-ready records without a JSON round-trip
+
+    Args:
+        df (DataFrame): Input dataframe
+
+    Returns:
+        List[Dict]: One dict per row, with datetime values as ISO strings
+    """
+    columns = list(df.columns)
+    datetime_positions = [
+        i
+        for i, dtype in enumerate(df.dtypes)
+        if pd.api.types.is_datetime64_any_dtype(dtype)
+    ]
+
+    records = []
+    for row in df.itertuples(index=False, name=None):
+        if datetime_positions:
+            row = list(row)
+            for i in datetime_positions:
+                row[i] = None if row[i] is pd.NaT else row[i].isoformat()
+        records.append(dict(zip(columns, row)))
+    return records
+
+
+def build_topics_table(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Explode the per-article topic lists into one row per article topic
+
+    Args:
+        df (DataFrame): Analysis dataset with a key_topics list column
+
+    Returns:
+        DataFrame: Long-format table indexed like df, with a categorical
+            topic column
+    """
+    return df["key_topics"].explode().dropna().astype("category").to_frame("topic")
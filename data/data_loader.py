@@ -1,4 +1,87 @@
+import hashlib
+import os
+import re
+import tempfile
+
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+NEWS_TEXT_COLUMNS = ("title", "summary", "excerpt")
+PRICE_COLUMNS = ("open", "high", "low", "close", "volume")
+
+
+def _restore_datetime_units(df: pd.DataFrame, parquet_path: str) -> pd.DataFrame:
+    """
+    Cast datetime columns back to the unit they had before the Parquet write
+
+    Args:
+        df (DataFrame): Data read from the Parquet copy
+        parquet_path (str): Path of the Parquet copy
+
+    Returns:
+        DataFrame: Data with the original datetime resolutions
+    """
+    # Parquet has no seconds unit, so datetime64[s] columns come back as [ms];
+    # the pandas metadata in the footer still records the original dtype
+    for column in pq.read_schema(parquet_path).pandas_metadata["columns"]:
+        unit = re.match(r"datetime64\[(\w+)", column["numpy_type"])
+        name = column["name"]
+        if unit and name in df and df[name].dt.unit != unit.group(1):
+            df[name] = df[name].dt.as_unit(unit.group(1))
+    return df
+
+
+def _read_csv_cached(file_path: str, **read_csv_kwargs) -> pd.DataFrame:
+    """
+    Read a CSV file through a sibling Parquet copy that is refreshed when stale
+
+    Args:
+        file_path (str): Path to the CSV file
+        **read_csv_kwargs: Keyword arguments forwarded to pd.read_csv
+
+    Returns:
+        DataFrame: Parsed data
+    """
+    # The read options are part of the cache name so dtype changes invalidate it
+    options_digest = hashlib.blake2b(
+        repr(sorted(read_csv_kwargs.items())).encode(), digest_size=4
+    ).hexdigest()
+    parquet_path = f"{file_path}.{options_digest}.parquet"
+    if os.path.exists(parquet_path) and os.path.getmtime(
+        parquet_path
+    ) >= os.path.getmtime(file_path):
+        try:
+            # Keep string columns Arrow-backed, as they were when read from CSV
+            with pd.option_context("mode.string_storage", "pyarrow"):
+                df = pd.read_parquet(parquet_path)
+            return _restore_datetime_units(df, parquet_path)
+        except (OSError, pa.ArrowException):
+            # An unreadable copy is a cache miss; it is rewritten below
+            pass
+
+    df = pd.read_csv(file_path, **read_csv_kwargs)
+    # Write under a temporary name and move it into place, so an interrupted
+    # write never leaves a truncated copy that looks fresh
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(parquet_path) or ".",
+            prefix=f"{os.path.basename(parquet_path)}.",
+            suffix=".tmp",
+        )
+        os.close(fd)
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, parquet_path)
+        tmp_path = None
+    except (OSError, pa.ArrowInvalid, pa.ArrowTypeError):
+        # The cache is an optimization only; keep going on read-only paths
+        # and on columns Arrow cannot store
+        pass
+    finally:
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return df
 
 
 def load_news_data(file_path):
@@ -11,10 +94,15 @@ def load_news_data(file_path):
     Returns:
         DataFrame: Preprocessed news data
     """
-    news_df = pd.read_csv(file_path)
+    # Dates are parsed and text lands in Arrow-backed columns in a single pass
+    news_df = _read_csv_cached(
+        file_path,
+        engine="pyarrow",
+        parse_dates=["published_date"],
+        dtype={column: "string[pyarrow]" for column in NEWS_TEXT_COLUMNS},
+    )
 
     # Basic preprocessing
-    news_df["published_date"] = pd.to_datetime(news_df["published_date"])
     news_df = news_df.sort_values("published_date")
 
     return news_df
@@ -31,7 +119,13 @@ def load_prices_data(file_path: str) -> pd.DataFrame:
         DataFrame: Bitcoin price data
     """
     try:
-        data = pd.read_csv(file_path)
+        data = _read_csv_cached(
+            file_path,
+            engine="pyarrow",
+            parse_dates=["timestamp"],
+            # float64 so prices reach the agent records exactly as written
+            dtype={column: "float64" for column in PRICE_COLUMNS},
+        )
         return data
     except Exception as e:
         print(f"Error fetching price data: {e}")
@@ -62,37 +156,44 @@ def get_articles_by_date(
 
     Args:
         date_str (str): Date in format YYYY-MM-DD
-        news_df (pd.DataFrame): News dataframe
+        news_df (pd.DataFrame): News dataframe, in any order
         max_articles (int): Maximum number of articles to return
 
     Returns:
         List[Dict]: List of articles
     """
     try:
-        date = pd.to_datetime(date_str).date()
-        filtered_df = news_df[news_df["published_date"].dt.date == date]
+        published_date = news_df["published_date"]
+        day_start = pd.Timestamp(date_str).normalize()
+        if published_date.dt.tz is not None:
+            day_start = day_start.tz_localize(published_date.dt.tz)
+
+        # The day is a contiguous slice once sorted; load_news_data output
+        # already is, samples such as create_sample's are not
+        if not published_date.is_monotonic_increasing:
+            news_df = news_df.sort_values("published_date")
+            published_date = news_df["published_date"]
+        start, end = published_date.searchsorted(
+            [day_start, day_start + pd.Timedelta(days=1)]
+        )
+        filtered_df = news_df.iloc[start:end]
 
         if len(filtered_df) == 0:
             return []
 
         sample = filtered_df.sample(min(max_articles, len(filtered_df)))
 
-        articles = []
-        for _, row in sample.iterrows():
-            articles.append(
-                {
-                    "title": row["title"],
-                    "summary": row["summary"]
-                    if not pd.isna(row["summary"])
-                    else (
-                        row["excerpt"]
-                        if not pd.isna(row["excerpt"])
-                        else "No content available"
-                    ),
-                    "date": row["published_date"].strftime("%Y-%m-%d"),
-                }
-            )
+        # Fill and format whole columns instead of boxing every row
+        summaries = (
+            sample["summary"].fillna(sample["excerpt"]).fillna("No content available")
+        )
+        dates = sample["published_date"].dt.strftime("%Y-%m-%d")
 
-        return articles
+        return [
+            {"title": title, "summary": summary, "date": date}
+            for title, summary, date in zip(
+                sample["title"].tolist(), summaries.tolist(), dates.tolist()
+            )
+        ]
     except Exception as e:
         return [{"error": str(e)}]
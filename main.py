@@ -1,20 +1,33 @@
 import argparse
+import asyncio
+import hashlib
 import logging
 import os
+import shelve
+import threading
 import time
 import warnings
-from concurrent.futures import ThreadPoolExecutor
 
+import orjson
 import pandas as pd
+from langchain.globals import set_llm_cache
+from langchain_community.cache import SQLiteCache
 from langchain_openai import ChatOpenAI
-from tqdm import tqdm
 
 import config
+from agents.news_agent import AGENT_PROMPT as NEWS_AGENT_PROMPT
 from agents.news_agent import create_news_analysis_agent
+from agents.relationship_agent import AGENT_PROMPT as RELATIONSHIP_AGENT_PROMPT
 from agents.relationship_agent import create_relationship_analysis_agent
-from data.data_engineering import calculate_price_changes, merge_news_price_data
+from data.data_engineering import (
+    build_topics_table,
+    calculate_price_changes,
+    dataframe_to_records,
+    merge_news_price_data,
+)
 from data.data_loader import create_sample, load_news_data, load_prices_data
-from tools.analysis_tools import create_analysis_tools
+from tools.analysis_tools import AGGREGATE_TOOL_PROMPTS, create_analysis_tools
+from tools.relationship_analysis_tools import RELATIONSHIP_TOOL_PROMPTS
 from visualization.visualizers import (
     plot_sentiment_distribution,
     plot_sentiment_over_time,
@@ -24,139 +37,317 @@ from visualization.visualizers import (
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Both agents may finish at the same time; shelve files are not thread-safe
+_AGENT_CACHE_LOCK = threading.Lock()
+# AgentExecutor answers with this when it hits its iteration or time limit
+_AGENT_STOPPED_PREFIX = "Agent stopped due to"
+
+NEWS_ANALYSIS_PROMPT = "Analyze the cryptocurrency news trends in this dataset. Identify main trends, overall market sentiment, and assess the potential impact on Bitcoin price."
+
+# Prompt text shaping each agent's answer besides its data, keyed into the
+# stored answers so that editing any template invalidates them
+NEWS_AGENT_PROMPTS = (NEWS_AGENT_PROMPT.pretty_repr(), *AGGREGATE_TOOL_PROMPTS)
+RELATIONSHIP_AGENT_PROMPTS = (
+    RELATIONSHIP_AGENT_PROMPT.pretty_repr(),
+    *RELATIONSHIP_TOOL_PROMPTS,
+)
+
 
 def setup_environment():
     """Set up the environment and initialize the LLM."""
     warnings.filterwarnings("ignore")
     os.environ["OPENAI_API_KEY"] = config.OPENAI_API_KEY
-    return ChatOpenAI(model=config.LLM_MODEL, temperature=config.LLM_TEMPERATURE)
+    # Identical prompts (re-runs, repeated articles) are answered from disk
+    set_llm_cache(SQLiteCache(database_path=config.LLM_CACHE_PATH))
+    return ChatOpenAI(
+        model=config.LLM_MODEL,
+        temperature=config.LLM_TEMPERATURE,
+        max_retries=config.LLM_MAX_RETRIES,
+    )
 
 
-def load_data(sample_size: int = 10) -> tuple:
-    """Load and prepare the datasets."""
+def load_news_sample(sample_size: int = 10) -> pd.DataFrame:
+    """Load the news dataset and draw the sample to analyze."""
     logger.info("Loading news dataset...")
     news_df = load_news_data(config.NEWS_DATA_PATH)
-    price_df = load_prices_data(config.PRICES_DATA_PATH)
-    price_df = calculate_price_changes(price_df)
 
-    news_sample = create_sample(news_df, sample_size)
-    news_sample["published_date"] = pd.to_datetime(news_sample["published_date"])
+    # published_date is already parsed by load_news_data
+    return create_sample(news_df, sample_size)
 
-    return news_sample, price_df
 
+def load_price_changes() -> pd.DataFrame:
+    """Load the price dataset and compute its change metrics."""
+    price_df = load_prices_data(config.PRICES_DATA_PATH)
+    return calculate_price_changes(price_df)
 
-def analyze_single_article(row, analysis_tools):
-    """Analyze a single news article."""
-    try:
-        article_text = row["summary"] if not pd.isna(row["summary"]) else row["excerpt"]
-        if pd.isna(article_text):
-            return None
 
-        analysis = analysis_tools["analyze_article"].invoke(
-            {"article_text": article_text, "article_title": row["title"]}
-        )
+def load_data(sample_size: int = 10) -> tuple:
+    """Load and prepare the datasets."""
+    return load_news_sample(sample_size), load_price_changes()
+
 
-        if "error" not in analysis:
-            analysis["date"] = row["published_date"]
-            analysis["title"] = row["title"]
-            return analysis
-        raise Exception("Analysis error")
-    except Exception as e:
-        logger.info(f"Error processing article: {str(e)}")
+def build_article_input(row) -> dict:
+    """Build the analyze_article input for a row, or None without text or title."""
+    article_text = row["summary"] if not pd.isna(row["summary"]) else row["excerpt"]
+    if pd.isna(article_text) or pd.isna(row["title"]):
         return None
+    return {"article_text": article_text, "article_title": row["title"]}
+
+
+def _collect_article_inputs(news_sample) -> tuple:
+    """
+    Pair each analyzable news row with an analyze_article input.
+
+    Syndicated articles share the same title and text and would get the same
+    analysis, so each distinct pair is sent once; `slots` maps every row to its
+    input.
+    """
+    rows_to_process = []
+    inputs = []
+    slots = []
+    input_slot_by_article = {}
+    for i in range(len(news_sample)):
+        row = news_sample.iloc[i]
+        article_input = build_article_input(row)
+        if article_input is None:
+            continue
+        # The title is part of the prompt, so it is part of the key too
+        article_key = (article_input["article_title"], article_input["article_text"])
+        if article_key not in input_slot_by_article:
+            input_slot_by_article[article_key] = len(inputs)
+            inputs.append(article_input)
+        rows_to_process.append(row)
+        slots.append(input_slot_by_article[article_key])
+
+    if len(inputs) < len(rows_to_process):
+        logger.info(f"Skipping {len(rows_to_process) - len(inputs)} duplicate articles")
+    return rows_to_process, inputs, slots
+
+
+def _collect_article_analyses(news_sample, rows_to_process, results, slots, start_time):
+    """Attach article metadata to successful analyses and log the outcome."""
+    article_analyses = []
+    for row, slot in zip(rows_to_process, slots):
+        analysis = results[slot]
+        if "error" in analysis:
+            logger.info(f"Error processing article: {analysis['error']}")
+            continue
+        # Duplicate texts share one result, so copy before adding metadata
+        analysis = dict(analysis)
+        # Canonical topics let the plots count them without re-normalizing
+        analysis["key_topics"] = [
+            topic.lower().strip() for topic in analysis["key_topics"]
+        ]
+        analysis["date"] = row["published_date"]
+        analysis["title"] = row["title"]
+        article_analyses.append(analysis)
+
+    end_time = time.time()
+    logger.info(f"Analysis completed in {end_time - start_time:.2f} seconds")
+    logger.info(
+        f"Successfully analyzed {len(article_analyses)} articles out of {len(news_sample)}"
+    )
+
+    return article_analyses
 
 
 def process_articles_in_parallel(news_sample, analysis_tools):
-    """Process articles in parallel using thread pool."""
+    """Process articles concurrently through the analyze_articles_batch tool."""
     logger.info("Analyzing sample articles with LLM in parallel...")
-    max_workers = os.cpu_count()  # Adjust based on system and API limits
+    rows_to_process, inputs, slots = _collect_article_inputs(news_sample)
+    start_time = time.time()
+
+    results = analysis_tools["analyze_articles_batch"].invoke({"articles": inputs})
+
+    return _collect_article_analyses(
+        news_sample, rows_to_process, results, slots, start_time
+    )
+
 
-    rows_to_process = [news_sample.iloc[i] for i in range(len(news_sample))]
+async def aprocess_articles_in_parallel(news_sample, analysis_tools):
+    """Async variant of process_articles_in_parallel."""
+    logger.info("Analyzing sample articles with LLM in parallel...")
+    rows_to_process, inputs, slots = _collect_article_inputs(news_sample)
     start_time = time.time()
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        results = list(
-            tqdm(
-                executor.map(
-                    lambda row: analyze_single_article(row, analysis_tools),
-                    rows_to_process,
-                ),
-                total=len(rows_to_process),
-                desc="Processing articles",
-            )
-        )
+    results = await analysis_tools["analyze_articles_batch"].ainvoke(
+        {"articles": inputs}
+    )
 
-    article_analyses = [result for result in results if result is not None]
+    return _collect_article_analyses(
+        news_sample, rows_to_process, results, slots, start_time
+    )
 
-    end_time = time.time()
-    logger.info(f"Analysis completed in {end_time - start_time:.2f} seconds")
-    logger.info(
-        f"Successfully analyzed {len(article_analyses)} articles out of {len(news_sample)}"
+
+def _agent_cache_key(prompt: str, agent_prompts: tuple, records: list) -> str:
+    """Key an agent answer by model, prompts and the full content of its records."""
+    payload = {
+        "model": config.LLM_MODEL,
+        "temperature": config.LLM_TEMPERATURE,
+        "prompt": prompt,
+        "agent_prompts": agent_prompts,
+        # The records are exactly what the agent's tools send to the LLM
+        "records": records,
+    }
+    return hashlib.blake2b(
+        orjson.dumps(
+            payload,
+            option=orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+            default=str,
+        ),
+        digest_size=16,
+    ).hexdigest()
+
+
+def _load_agent_output(cache_key: str, see_chain_of_thought: bool):
+    """Return a stored agent answer, or None if the agent has to run."""
+    # A replayed answer has no chain of thought to show
+    if not config.AGENT_CACHE_ENABLED or see_chain_of_thought:
+        return None
+    with _AGENT_CACHE_LOCK, shelve.open(config.AGENT_CACHE_PATH) as cache:
+        output = cache.get(cache_key)
+    if output is not None:
+        logger.info("Reusing cached agent answer for this prompt and dataset")
+    return output
+
+
+def _is_complete_answer(agent_result: dict) -> bool:
+    """Whether an agent run finished on its own, with no tool reporting an error."""
+    if agent_result["output"].startswith(_AGENT_STOPPED_PREFIX):
+        return False
+    return not any(
+        isinstance(observation, dict) and "error" in observation
+        for _, observation in agent_result["intermediate_steps"]
     )
 
-    return article_analyses
+
+def _store_agent_output(cache_key: str, agent_result: dict):
+    """Persist a complete agent answer for later runs over the same data."""
+    if not config.AGENT_CACHE_ENABLED:
+        return
+    # Stopped or error-based answers would otherwise be replayed on every run
+    if not _is_complete_answer(agent_result):
+        logger.info("Not caching agent answer: the run stopped early or a tool failed")
+        return
+    with _AGENT_CACHE_LOCK, shelve.open(config.AGENT_CACHE_PATH) as cache:
+        cache[cache_key] = agent_result["output"]
+
+
+def _prepare_agent_run(
+    agent_name: str,
+    create_agent,
+    agent_prompts: tuple,
+    prompt: str,
+    llm,
+    data_df,
+    see_chain_of_thought,
+) -> tuple:
+    """
+    Look up a stored answer for an agent run, creating the agent only on a miss.
+
+    Returns:
+        tuple: (cache key, stored answer or None, agent or None)
+    """
+    # Records are built once here and shared by the cache key and the agent
+    records = dataframe_to_records(data_df)
+    cache_key = _agent_cache_key(prompt, agent_prompts, records)
+    cached_output = _load_agent_output(cache_key, see_chain_of_thought)
+    if cached_output is not None:
+        return cache_key, cached_output, None
+    logger.info(f"Creating {agent_name}...")
+    return cache_key, None, create_agent(llm, records, verbose=see_chain_of_thought)
+
+
+def _prepare_news_analysis(llm, analysis_sample, see_chain_of_thought) -> tuple:
+    """Shared setup of run_news_analysis and arun_news_analysis."""
+    return _prepare_agent_run(
+        "news analysis agent",
+        create_news_analysis_agent,
+        NEWS_AGENT_PROMPTS,
+        NEWS_ANALYSIS_PROMPT,
+        llm,
+        analysis_sample,
+        see_chain_of_thought,
+    )
 
 
 def run_news_analysis(llm, analysis_sample, see_chain_of_thought):
     """Run the news analysis agent."""
-    logger.info("Creating news analysis agent...")
-    news_agent = create_news_analysis_agent(
-        llm, analysis_sample, verbose=see_chain_of_thought
+    cache_key, cached_output, news_agent = _prepare_news_analysis(
+        llm, analysis_sample, see_chain_of_thought
     )
+    if news_agent is None:
+        return cached_output
 
     logger.info("Performing comprehensive trend analysis...")
-    news_analysis = news_agent.invoke(
-        {
-            "input": "Analyze the cryptocurrency news trends in this dataset. Identify main trends, overall market sentiment, and assess the potential impact on Bitcoin price."
-        }
+    news_analysis = news_agent.invoke({"input": NEWS_ANALYSIS_PROMPT})
+
+    _store_agent_output(cache_key, news_analysis)
+    return news_analysis["output"]
+
+
+async def arun_news_analysis(llm, analysis_sample, see_chain_of_thought):
+    """Async variant of run_news_analysis, for callers already in an event loop."""
+    cache_key, cached_output, news_agent = _prepare_news_analysis(
+        llm, analysis_sample, see_chain_of_thought
     )
+    if news_agent is None:
+        return cached_output
 
+    logger.info("Performing comprehensive trend analysis...")
+    news_analysis = await news_agent.ainvoke({"input": NEWS_ANALYSIS_PROMPT})
+
+    _store_agent_output(cache_key, news_analysis)
     return news_analysis["output"]
 
 
 def run_relationship_analysis(llm, merged_sample, see_chain_of_thought):
     """Run the relationship analysis agent."""
-    relationship_agent = create_relationship_analysis_agent(
-        llm, merged_sample, verbose=see_chain_of_thought
-    )
-    relationship_analysis = relationship_agent.invoke(
-        {
-            "input": "Analyze correlations between news sentiment and Bitcoin price movements. What patterns do you see? Finally, generate trading insights based on the correlation analysis."
-        }
+    prompt = "Analyze correlations between news sentiment and Bitcoin price movements. What patterns do you see? Finally, generate trading insights based on the correlation analysis."
+    cache_key, cached_output, relationship_agent = _prepare_agent_run(
+        "relationship analysis agent",
+        create_relationship_analysis_agent,
+        RELATIONSHIP_AGENT_PROMPTS,
+        prompt,
+        llm,
+        merged_sample,
+        see_chain_of_thought,
     )
+    if relationship_agent is None:
+        return cached_output
+
+    relationship_analysis = relationship_agent.invoke({"input": prompt})
 
+    _store_agent_output(cache_key, relationship_analysis)
     return relationship_analysis["output"]
 
 
 def display_statistics(analysis_sample):
     """Display statistics about the analyzed articles."""
+    total = len(analysis_sample)
+    sentiment_counts = analysis_sample["sentiment"].value_counts()
+    category_labels = {
+        "tech_focused": "Tech-focused articles",
+        "regulatory_focused": "Regulatory-focused articles",
+        "investment_advice": "Articles with investment advice",
+        "rumors_speculation": "Articles with rumors/speculation",
+    }
+    category_counts = analysis_sample[list(category_labels)].sum()
+
     logger.info("Sentiment Statistics:")
     logger.info(
         f"Average sentiment score: {analysis_sample['sentiment_score'].mean():.3f}"
     )
-    logger.info(
-        f"Positive articles: {(analysis_sample['sentiment'] == 'positive').sum()} ({(analysis_sample['sentiment'] == 'positive').sum() / len(analysis_sample) * 100:.1f}%)"
-    )
-    logger.info(
-        f"Neutral articles: {(analysis_sample['sentiment'] == 'neutral').sum()} ({(analysis_sample['sentiment'] == 'neutral').sum() / len(analysis_sample) * 100:.1f}%)"
-    )
-    logger.info(
-        f"Negative articles: {(analysis_sample['sentiment'] == 'negative').sum()} ({(analysis_sample['sentiment'] == 'negative').sum() / len(analysis_sample) * 100:.1f}%)"
-    )
+    for sentiment in ("positive", "neutral", "negative"):
+        count = sentiment_counts.get(sentiment, 0)
+        logger.info(
+            f"{sentiment.capitalize()} articles: {count} ({count / total * 100:.1f}%)"
+        )
 
     logger.info("Article Categories:")
-    logger.info(
-        f"Tech-focused articles: {analysis_sample['tech_focused'].sum()} ({analysis_sample['tech_focused'].sum() / len(analysis_sample) * 100:.1f}%)"
-    )
-    logger.info(
-        f"Regulatory-focused articles: {analysis_sample['regulatory_focused'].sum()} ({analysis_sample['regulatory_focused'].sum() / len(analysis_sample) * 100:.1f}%)"
-    )
-    logger.info(
-        f"Articles with investment advice: {analysis_sample['investment_advice'].sum()} ({analysis_sample['investment_advice'].sum() / len(analysis_sample) * 100:.1f}%)"
-    )
-    logger.info(
-        f"Articles with rumors/speculation: {analysis_sample['rumors_speculation'].sum()} ({analysis_sample['rumors_speculation'].sum() / len(analysis_sample) * 100:.1f}%)"
-    )
+    for column, label in category_labels.items():
+        count = category_counts[column]
+        logger.info(f"{label}: {count} ({count / total * 100:.1f}%)")
 
 
 def create_visualizations(analysis_sample):
@@ -164,34 +355,49 @@ def create_visualizations(analysis_sample):
     logger.info("Generating visualizations...")
     plot_sentiment_distribution(analysis_sample)
     plot_sentiment_over_time(analysis_sample)
-    plot_top_topics(analysis_sample)
+    plot_top_topics(analysis_sample, topics_df=build_topics_table(analysis_sample))
 
 
-def run_complete_analysis(sample_size: int, see_chain_of_thought: bool) -> dict:
+async def run_complete_analysis(sample_size: int, see_chain_of_thought: bool) -> dict:
     """Main function to orchestrate the entire process."""
     # Step 1: Setup
     llm = setup_environment()
 
-    # Step 2: Data loading
-    news_sample, price_df = load_data(sample_size)
-
-    # Step 3: Create tools
-    analysis_tools = create_analysis_tools(llm)
+    # Step 2: Data loading. Prices are only needed for the merge, so they load
+    # in the background while the articles go through the LLM
+    price_task = asyncio.create_task(asyncio.to_thread(load_price_changes))
+    try:
+        # Step 3: Create tools
+        news_sample, analysis_tools = await asyncio.gather(
+            asyncio.to_thread(load_news_sample, sample_size),
+            asyncio.to_thread(create_analysis_tools, llm),
+        )
 
-    # Step 4: Process articles
-    article_analyses = process_articles_in_parallel(news_sample, analysis_tools)
+        # Step 4: Process articles
+        article_analyses = await aprocess_articles_in_parallel(
+            news_sample, analysis_tools
+        )
 
-    # Step 5: Create dataframe from results
-    analysis_sample = pd.DataFrame(article_analyses)
-    analysis_sample["date"] = pd.to_datetime(analysis_sample["date"])
+        # Step 5: Create dataframe from results
+        analysis_sample = pd.DataFrame(article_analyses)
+        analysis_sample["date"] = pd.to_datetime(analysis_sample["date"])
+        price_df = await price_task
+    finally:
+        # If an earlier step failed, stop waiting on the prices and retrieve
+        # the task's outcome so its own error is not reported as unhandled
+        if not price_task.done():
+            price_task.cancel()
+        await asyncio.gather(price_task, return_exceptions=True)
     merged_sample = merge_news_price_data(analysis_sample, price_df)
 
-    # Step 6: Run analyses
-    news_analysis = run_news_analysis(llm, analysis_sample, see_chain_of_thought)
-    logger.info(f"News analysis:\n{news_analysis}")
-    relationship_analysis = run_relationship_analysis(
-        llm, merged_sample, see_chain_of_thought
+    # Step 6: Run analyses. The two agents are independent of each other
+    news_analysis, relationship_analysis = await asyncio.gather(
+        arun_news_analysis(llm, analysis_sample, see_chain_of_thought),
+        asyncio.to_thread(
+            run_relationship_analysis, llm, merged_sample, see_chain_of_thought
+        ),
     )
+    logger.info(f"News analysis:\n{news_analysis}")
     logger.info(f"News and prices relationship analysis:\n{relationship_analysis}")
 
     # Step 7: Visualizations
@@ -223,7 +429,9 @@ def main():
 
     args = parser.parse_args()
 
-    return run_complete_analysis(args.sample_size, args.see_chain_of_thought)
+    return asyncio.run(
+        run_complete_analysis(args.sample_size, args.see_chain_of_thought)
+    )
 
 
 if __name__ == "__main__":
@@ -1,6 +1,6 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, TypedDict
 
-from langchain.pydantic_v1 import BaseModel, Field
+from pydantic import BaseModel, Field
 
 
 class NewsAnalysis(BaseModel):
@@ -56,6 +56,27 @@ class NewsAnalysis(BaseModel):
     )
 
 
+class NewsAnalysisRecord(TypedDict):
+    """Plain-dict view of a parsed NewsAnalysis, as passed between pipeline stages"""
+
+    sentiment: str
+    sentiment_score: float
+    key_topics: List[str]
+    bitcoin_impact_potential: str
+    expected_price_movement: Dict[str, float]
+    impact_probability: float
+    time_horizon: str
+    key_entities: List[Dict[str, Any]]
+    credibility_score: float
+    rumors_speculation: bool
+    tech_focused: bool
+    regulatory_focused: bool
+    investment_advice: bool
+    catalytic_potential: float
+    trading_signal: Dict[str, Any]
+    price_triggers: List[Dict[str, Any]]
+
+
 class TopicTrendAnalysis(BaseModel):
     """Analysis of trending topics in cryptocurrency news with market impact assessment"""
 
@@ -1,42 +1,23 @@
-import json
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Union
 
+import orjson
 from langchain.output_parsers import PydanticOutputParser
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.tools import StructuredTool, Tool
 
+import config
 from models.schemas import (
     MarketInfluenceAnalysis,
     NewsAnalysis,
+    NewsAnalysisRecord,
     SentimentAnalysis,
     TopicTrendAnalysis,
 )
+from tools.errors import errors_as_result
 
-
-def create_analysis_tools(llm):
-    """
-    Create and return tool functions with the LLM already bound
-
-    Args:
-        llm: The language model to use
-
-    Returns:
-        dict: Dictionary of tool functions
-    """
-
-    def analyze_article(article_text: str, article_title: str) -> dict:
-        """
-        Analyze a single cryptocurrency news article.
-
-        Args:
-            article_text (str): The article text
-            article_title (str): The article title
-
-        Returns:
-            dict: Structured analysis of the article
-        """
-        parser = PydanticOutputParser(pydantic_object=NewsAnalysis)
-
-        template = """
+_ARTICLE_TEMPLATE = """
         You are a professional crypto market strategist whose analysis is used by institutional investors managing billions in assets. Your assessments directly influence trading decisions.
 
         Analyze this Bitcoin article with precision:
@@ -58,36 +39,24 @@ def create_analysis_tools(llm):
 
         {format_instructions}
         """
+_ARTICLE_PARSER = PydanticOutputParser(pydantic_object=NewsAnalysis)
+_ARTICLE_FORMAT_INSTRUCTIONS = _ARTICLE_PARSER.get_format_instructions()
+_ARTICLE_PROMPT = ChatPromptTemplate.from_template(_ARTICLE_TEMPLATE)
 
-        prompt = ChatPromptTemplate.from_template(template)
-
-        chain = prompt | llm | parser
 
-        try:
-            result = chain.invoke(
-                {
-                    "title": article_title,
-                    "content": article_text,
-                    "format_instructions": parser.get_format_instructions(),
-                }
-            )
-            return result.dict()
-        except Exception as e:
-            return {"error": str(e)}
-
-    def analyze_topics(article_analyses: list) -> dict:
-        """
-        Analyze trending topics across multiple cryptocurrency news articles.
-
-        Args:
-            article_analyses (List[Dict]): List of article analyses
+def _parse_article(text: str) -> NewsAnalysis:
+    """Parse the article reply as bare JSON, falling back to the output parser"""
+    # Replies are usually one JSON object, optionally fenced; the parser's
+    # markdown and partial-JSON handling is only needed when that fails
+    try:
+        return NewsAnalysis.model_validate(
+            orjson.loads(text[text.find("{") : text.rfind("}") + 1])
+        )
+    except ValueError:
+        return _ARTICLE_PARSER.parse(text)
 
-        Returns:
-            dict: Analysis of trending topics
-        """
-        parser = PydanticOutputParser(pydantic_object=TopicTrendAnalysis)
 
-        template = """
+_TOPICS_TEMPLATE = """
         You are a quantitative crypto analyst specializing in pattern recognition across market narratives. Your insights drive institutional trading strategies.
 
         Analyze these Bitcoin news articles:
@@ -103,37 +72,12 @@ def create_analysis_tools(llm):
 
         {format_instructions}
         """
+_TOPICS_PARSER = PydanticOutputParser(pydantic_object=TopicTrendAnalysis)
+_TOPICS_FORMAT_INSTRUCTIONS = _TOPICS_PARSER.get_format_instructions()
+_TOPICS_PROMPT = ChatPromptTemplate.from_template(_TOPICS_TEMPLATE)
 
-        prompt = ChatPromptTemplate.from_template(template)
-
-        chain = prompt | llm | parser
-
-        try:
-            # Convert article analyses to a more readable format
-            analyses_str = json.dumps(article_analyses, indent=2)
-            result = chain.invoke(
-                {
-                    "article_analyses": analyses_str,
-                    "format_instructions": parser.get_format_instructions(),
-                }
-            )
-            return result.dict()
-        except Exception as e:
-            return {"error": str(e)}
-
-    def analyze_sentiment(article_analyses: list) -> dict:
-        """
-        Analyze overall sentiment across multiple cryptocurrency news articles.
 
-        Args:
-            article_analyses (List[Dict]): List of article analyses
-
-        Returns:
-            dict: Overall sentiment analysis
-        """
-        parser = PydanticOutputParser(pydantic_object=SentimentAnalysis)
-
-        template = """
+_SENTIMENT_TEMPLATE = """
         You are a market sentiment specialist whose analysis is used by quantitative trading desks to time entries and exits.
 
         Based on these Bitcoin articles:
@@ -149,37 +93,12 @@ def create_analysis_tools(llm):
 
         {format_instructions}
         """
+_SENTIMENT_PARSER = PydanticOutputParser(pydantic_object=SentimentAnalysis)
+_SENTIMENT_FORMAT_INSTRUCTIONS = _SENTIMENT_PARSER.get_format_instructions()
+_SENTIMENT_PROMPT = ChatPromptTemplate.from_template(_SENTIMENT_TEMPLATE)
 
-        prompt = ChatPromptTemplate.from_template(template)
-
-        chain = prompt | llm | parser
 
-        try:
-            # Convert article analyses to a more readable format
-            analyses_str = json.dumps(article_analyses, indent=2)
-            result = chain.invoke(
-                {
-                    "article_analyses": analyses_str,
-                    "format_instructions": parser.get_format_instructions(),
-                }
-            )
-            return result.dict()
-        except Exception as e:
-            return {"error": str(e)}
-
-    def analyze_market_influence(article_analyses: list) -> dict:
-        """
-        Analyze how news might influence the cryptocurrency market.
-
-        Args:
-            article_analyses (List[Dict]): List of article analyses
-
-        Returns:
-            dict: Analysis of market influence
-        """
-        parser = PydanticOutputParser(pydantic_object=MarketInfluenceAnalysis)
-
-        template = """
+_INFLUENCE_TEMPLATE = """
         You are a senior market strategist whose investment theses guide portfolio allocation for crypto funds.
 
         Analyze these Bitcoin news articles:
@@ -195,23 +114,198 @@ def create_analysis_tools(llm):
 
         {format_instructions}
         """
+_INFLUENCE_PARSER = PydanticOutputParser(pydantic_object=MarketInfluenceAnalysis)
+_INFLUENCE_FORMAT_INSTRUCTIONS = _INFLUENCE_PARSER.get_format_instructions()
+_INFLUENCE_PROMPT = ChatPromptTemplate.from_template(_INFLUENCE_TEMPLATE)
+
+# Prompt text behind the aggregator tools, for callers keying stored answers
+AGGREGATE_TOOL_PROMPTS = (
+    _TOPICS_TEMPLATE,
+    _TOPICS_FORMAT_INSTRUCTIONS,
+    _SENTIMENT_TEMPLATE,
+    _SENTIMENT_FORMAT_INSTRUCTIONS,
+    _INFLUENCE_TEMPLATE,
+    _INFLUENCE_FORMAT_INSTRUCTIONS,
+)
 
-        prompt = ChatPromptTemplate.from_template(template)
 
-        chain = prompt | llm | parser
+def dump_analyses(article_analyses: Union[list, str]) -> str:
+    """
+    Convert article analyses to the readable JSON the aggregator prompts embed
 
-        try:
-            # Convert article analyses to a more readable format
-            analyses_str = json.dumps(article_analyses, indent=2)
-            result = chain.invoke(
-                {
-                    "article_analyses": analyses_str,
-                    "format_instructions": parser.get_format_instructions(),
-                }
-            )
-            return result.dict()
-        except Exception as e:
-            return {"error": str(e)}
+    Args:
+        article_analyses (List[Dict] | str): List of article analyses, or text
+            already produced by this function, which is returned unchanged
+
+    Returns:
+        str: Indented JSON text
+    """
+    # Callers running several aggregators on one list serialize it once and
+    # pass the text to each of them
+    if isinstance(article_analyses, str):
+        return article_analyses
+    return orjson.dumps(
+        article_analyses,
+        option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY,
+        default=str,
+    ).decode()
+
+
+def create_analysis_tools(llm):
+    """
+    Create and return tool functions with the LLM already bound
+
+    Args:
+        llm: The language model to use
+
+    Returns:
+        dict: Dictionary of tool functions
+    """
+    topics_chain = _TOPICS_PROMPT | llm | _TOPICS_PARSER
+    sentiment_chain = _SENTIMENT_PROMPT | llm | _SENTIMENT_PARSER
+    influence_chain = _INFLUENCE_PROMPT | llm | _INFLUENCE_PARSER
+
+    # analyze_article runs once per article, so it skips the RunnableSequence
+    # dispatch and calls the prompt, model and parser directly. Repeated
+    # articles are answered from memory; failures raise and are not cached
+    @functools.lru_cache(maxsize=4096)
+    def invoke_article(title: str, content: str) -> NewsAnalysis:
+        messages = _ARTICLE_PROMPT.format_messages(
+            title=title,
+            content=content,
+            format_instructions=_ARTICLE_FORMAT_INSTRUCTIONS,
+        )
+        return _parse_article(llm.invoke(messages).content)
+
+    @errors_as_result
+    def analyze_article(article_text: str, article_title: str) -> NewsAnalysisRecord:
+        """
+        Analyze a single cryptocurrency news article.
+
+        Args:
+            article_text (str): The article text
+            article_title (str): The article title
+
+        Returns:
+            dict: Structured analysis of the article
+        """
+        # Copy so callers can annotate the result without touching the cache
+        return dict(invoke_article(article_title, article_text).__dict__)
+
+    @errors_as_result
+    def analyze_batch_item(article: dict) -> NewsAnalysisRecord:
+        """Analyze one batch entry, failing only that entry if it is malformed"""
+        article_text = article["article_text"]
+        article_title = article["article_title"]
+        if not isinstance(article_text, str) or not isinstance(article_title, str):
+            raise ValueError("article_text and article_title must be strings")
+        return analyze_article(article_text, article_title)
+
+    def analyze_articles_batch(articles: List[dict]) -> List[NewsAnalysisRecord]:
+        """
+        Analyze several cryptocurrency news articles concurrently.
+
+        Args:
+            articles (List[dict]): Articles with "article_text" and
+                "article_title" keys
+
+        Returns:
+            List[dict]: Structured analysis per article, in input order, or
+                {"error": ...} for the articles that failed
+        """
+        # Entries are checked one by one, so a malformed article only fails
+        # itself; each goes through analyze_article, so repeats hit its memo
+        with ThreadPoolExecutor(max_workers=config.LLM_CONCURRENCY) as executor:
+            return list(executor.map(analyze_batch_item, articles))
+
+    # The three aggregators differ only in chain and format instructions, so
+    # the sync and async tools share these two helpers
+    def aggregate_inputs(
+        article_analyses: Union[list, str], format_instructions: str
+    ) -> dict:
+        """Build the prompt variables of an aggregator chain"""
+        return {
+            "article_analyses": dump_analyses(article_analyses),
+            "format_instructions": format_instructions,
+        }
+
+    @errors_as_result
+    def invoke_aggregate(
+        chain, article_analyses: Union[list, str], format_instructions: str
+    ) -> dict:
+        """Run an aggregator chain and return its parsed result as a dict"""
+        result = chain.invoke(aggregate_inputs(article_analyses, format_instructions))
+        return dict(result)
+
+    @errors_as_result
+    async def ainvoke_aggregate(
+        chain, article_analyses: Union[list, str], format_instructions: str
+    ) -> dict:
+        """Async variant of invoke_aggregate"""
+        result = await chain.ainvoke(
+            aggregate_inputs(article_analyses, format_instructions)
+        )
+        return dict(result)
+
+    def analyze_topics(article_analyses: Union[list, str]) -> dict:
+        """
+        Analyze trending topics across multiple cryptocurrency news articles.
+
+        Args:
+            article_analyses (List[Dict] | str): Analyses or their dump_analyses text
+
+        Returns:
+            dict: Analysis of trending topics
+        """
+        return invoke_aggregate(
+            topics_chain, article_analyses, _TOPICS_FORMAT_INSTRUCTIONS
+        )
+
+    def analyze_sentiment(article_analyses: Union[list, str]) -> dict:
+        """
+        Analyze overall sentiment across multiple cryptocurrency news articles.
+
+        Args:
+            article_analyses (List[Dict] | str): Analyses or their dump_analyses text
+
+        Returns:
+            dict: Overall sentiment analysis
+        """
+        return invoke_aggregate(
+            sentiment_chain, article_analyses, _SENTIMENT_FORMAT_INSTRUCTIONS
+        )
+
+    def analyze_market_influence(article_analyses: Union[list, str]) -> dict:
+        """
+        Analyze how news might influence the cryptocurrency market.
+
+        Args:
+            article_analyses (List[Dict] | str): Analyses or their dump_analyses text
+
+        Returns:
+            dict: Analysis of market influence
+        """
+        return invoke_aggregate(
+            influence_chain, article_analyses, _INFLUENCE_FORMAT_INSTRUCTIONS
+        )
+
+    async def aanalyze_topics(article_analyses: Union[list, str]) -> dict:
+        """Async variant of analyze_topics"""
+        return await ainvoke_aggregate(
+            topics_chain, article_analyses, _TOPICS_FORMAT_INSTRUCTIONS
+        )
+
+    async def aanalyze_sentiment(article_analyses: Union[list, str]) -> dict:
+        """Async variant of analyze_sentiment"""
+        return await ainvoke_aggregate(
+            sentiment_chain, article_analyses, _SENTIMENT_FORMAT_INSTRUCTIONS
+        )
+
+    async def aanalyze_market_influence(article_analyses: Union[list, str]) -> dict:
+        """Async variant of analyze_market_influence"""
+        return await ainvoke_aggregate(
+            influence_chain, article_analyses, _INFLUENCE_FORMAT_INSTRUCTIONS
+        )
 
     # Create and return the tools
     return {
@@ -220,18 +314,26 @@ def create_analysis_tools(llm):
             name="analyze_article",
             description="Analyze a single cryptocurrency news article",
         ),
+        "analyze_articles_batch": StructuredTool.from_function(
+            func=analyze_articles_batch,
+            name="analyze_articles_batch",
+            description="Analyze several cryptocurrency news articles concurrently",
+        ),
         "analyze_topics": StructuredTool.from_function(
             func=analyze_topics,
+            coroutine=aanalyze_topics,
             name="analyze_topics",
             description="Analyze trending topics across multiple articles",
         ),
         "analyze_sentiment": StructuredTool.from_function(
             func=analyze_sentiment,
+            coroutine=aanalyze_sentiment,
             name="analyze_sentiment",
             description="Analyze overall sentiment across articles",
         ),
         "analyze_market_influence": StructuredTool.from_function(
             func=analyze_market_influence,
+            coroutine=aanalyze_market_influence,
             name="analyze_market_influence",
             description="Analyze how news might influence the market",
         ),
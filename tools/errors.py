@@ -0,0 +1,37 @@
+import functools
+import inspect
+
+
+def errors_as_result(func):
+    """
+    Report a tool's failure to the agent as {"error": ...} instead of raising
+
+    Transient API errors (rate limits, timeouts, 5xx) are already retried with
+    backoff by the LLM client, see config.LLM_MAX_RETRIES; what still fails
+    here is returned so the agent can carry on with the other tools.
+
+    Args:
+        func: Tool function or coroutine function
+
+    Returns:
+        Wrapped function with the same signature
+    """
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                return {"error": str(e)}
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            return {"error": str(e)}
+
+    return wrapper
@@ -1,12 +1,72 @@
-import json
+import csv
+import io
 from typing import Any, Dict, List
 
-import pandas as pd
+import orjson
 from langchain.output_parsers import PydanticOutputParser
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.tools import StructuredTool
 
 from models.schemas import MarketActionRecommendation, PriceNewsCorrelationAnalysis
+from tools.errors import errors_as_result
+
+_CORRELATION_TEMPLATE = """
+        You are a quantitative financial analyst specializing in news-based alpha generation for crypto markets.
+
+        Analyze these news-price relationships:
+        {merged_data}
+
+        Deliver statistical market intelligence:
+        1. Correlation strength: R-values by news category with confidence intervals
+        2. Signal lag patterns: Measurable timeframes between news events and price reactions
+        3. Market inefficiency map: Opportunities where news is consistently mispriced
+        4. Implementation framework: Specific criteria for strategy execution
+
+        Your analysis must be presented with statistical rigor and include specific, testable hypotheses.
+
+        {format_instructions}
+        """
+_CORRELATION_PARSER = PydanticOutputParser(pydantic_object=PriceNewsCorrelationAnalysis)
+_CORRELATION_FORMAT_INSTRUCTIONS = _CORRELATION_PARSER.get_format_instructions()
+_CORRELATION_PROMPT = ChatPromptTemplate.from_template(_CORRELATION_TEMPLATE)
+
+
+_INSIGHTS_TEMPLATE = """
+        You are the chief investment strategist at a crypto hedge fund, responsible for final position decisions.
+
+        Based on this analysis:
+        {analysis_data}
+
+        Provide institutional-grade recommendations:
+        1. Position directive: Clear action (strong buy/buy/neutral/sell/strong sell) with confidence percentage
+        2. Scenario analysis: Alternative outcomes with corresponding position adjustments
+        3. Performance benchmarks: Metrics to evaluate strategy effectiveness
+
+        Your recommendations must be specific enough to be immediately implementable by a trading desk.
+
+        {format_instructions}
+        """
+_INSIGHTS_PARSER = PydanticOutputParser(pydantic_object=MarketActionRecommendation)
+_INSIGHTS_FORMAT_INSTRUCTIONS = _INSIGHTS_PARSER.get_format_instructions()
+_INSIGHTS_PROMPT = ChatPromptTemplate.from_template(_INSIGHTS_TEMPLATE)
+
+# Prompt text behind the relationship tools, for callers keying stored answers
+RELATIONSHIP_TOOL_PROMPTS = (
+    _CORRELATION_TEMPLATE,
+    _CORRELATION_FORMAT_INSTRUCTIONS,
+    _INSIGHTS_TEMPLATE,
+    _INSIGHTS_FORMAT_INSTRUCTIONS,
+)
+
+
+def _records_to_csv(records: List[Dict[str, Any]]) -> str:
+    """Render records as CSV text, one column per key seen in any record."""
+    fieldnames = list(dict.fromkeys(key for record in records for key in record))
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, lineterminator="\n")
+    writer.writeheader()
+    writer.writerows(records)
+    return buffer.getvalue()
 
 
 def create_relationship_analysis_tools(llm):
@@ -19,7 +79,10 @@ def create_relationship_analysis_tools(llm):
     Returns:
         dict: Dictionary of tool functions
     """
+    correlation_chain = _CORRELATION_PROMPT | llm | _CORRELATION_PARSER
+    insights_chain = _INSIGHTS_PROMPT | llm | _INSIGHTS_PARSER
 
+    @errors_as_result
     def analyze_price_news_correlation(
         merged_data_records: List[Dict[str, Any]]
     ) -> dict:
@@ -32,45 +95,17 @@ def create_relationship_analysis_tools(llm):
         Returns:
             dict: Analysis of correlations
         """
-        parser = PydanticOutputParser(pydantic_object=PriceNewsCorrelationAnalysis)
-
-        # Convert records to DataFrame (if needed in the function)
-        merged_data_sample = pd.DataFrame(merged_data_records)
-
-        template = """
-        You are a quantitative financial analyst specializing in news-based alpha generation for crypto markets.
-
-        Analyze these news-price relationships:
-        {merged_data}
-
-        Deliver statistical market intelligence:
-        1. Correlation strength: R-values by news category with confidence intervals
-        2. Signal lag patterns: Measurable timeframes between news events and price reactions
-        3. Market inefficiency map: Opportunities where news is consistently mispriced
-        4. Implementation framework: Specific criteria for strategy execution
-
-        Your analysis must be presented with statistical rigor and include specific, testable hypotheses.
-
-        {format_instructions}
-        """
-
-        prompt = ChatPromptTemplate.from_template(template)
-
-        chain = prompt | llm | parser
-
-        try:
-            # Convert DataFrame to a readable string format for the LLM
-            merged_data_str = merged_data_sample.to_string()
-            result = chain.invoke(
-                {
-                    "merged_data": merged_data_str,
-                    "format_instructions": parser.get_format_instructions(),
-                }
-            )
-            return result.dict()
-        except Exception as e:
-            return {"error": str(e)}
-
+        # Lay the records out as a table for the LLM
+        merged_data_str = _records_to_csv(merged_data_records)
+        result = correlation_chain.invoke(
+            {
+                "merged_data": merged_data_str,
+                "format_instructions": _CORRELATION_FORMAT_INSTRUCTIONS,
+            }
+        )
+        return dict(result)
+
+    @errors_as_result
     def generate_trading_insights(merged_analysis: dict) -> dict:
         """
         Generate actionable trading insights based on news-price analysis
@@ -81,39 +116,18 @@ def create_relationship_analysis_tools(llm):
         Returns:
             dict: Actionable insights for trading
         """
-        parser = PydanticOutputParser(pydantic_object=MarketActionRecommendation)
-
-        template = """
-        You are the chief investment strategist at a crypto hedge fund, responsible for final position decisions.
-
-        Based on this analysis:
-        {analysis_data}
-
-        Provide institutional-grade recommendations:
-        1. Position directive: Clear action (strong buy/buy/neutral/sell/strong sell) with confidence percentage
-        2. Scenario analysis: Alternative outcomes with corresponding position adjustments
-        3. Performance benchmarks: Metrics to evaluate strategy effectiveness
-
-        Your recommendations must be specific enough to be immediately implementable by a trading desk.
-
-        {format_instructions}
-        """
-
-        prompt = ChatPromptTemplate.from_template(template)
-
-        chain = prompt | llm | parser
-
-        try:
-            analysis_str = json.dumps(merged_analysis, indent=2)
-            result = chain.invoke(
-                {
-                    "analysis_data": analysis_str,
-                    "format_instructions": parser.get_format_instructions(),
-                }
-            )
-            return result.dict()
-        except Exception as e:
-            return {"error": str(e)}
+        analysis_str = orjson.dumps(
+            merged_analysis,
+            option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY,
+            default=str,
+        ).decode()
+        result = insights_chain.invoke(
+            {
+                "analysis_data": analysis_str,
+                "format_instructions": _INSIGHTS_FORMAT_INSTRUCTIONS,
+            }
+        )
+        return dict(result)
 
     # Create and return the tools
     return {
@@ -1,49 +1,151 @@
+import os
+
+import matplotlib
+
+import config
+from data.data_engineering import build_topics_table
+
+if config.PLOTS_OUTPUT_DIR:
+    matplotlib.use("Agg")
+
+import matplotlib.dates as mdates
 import matplotlib.pyplot as plt
 import pandas as pd
 import seaborn as sns
 
+# Above this many articles the sentiment timeline is binned rather than scattered
+HEXBIN_MIN_POINTS = 20000
+# Longer topic labels are truncated so the topics plot keeps a fixed margin
+TOPIC_LABEL_MAX_CHARS = 32
+
+# Fixed subplot margins for the 18x5 figure, used instead of tight_layout
+_MARGINS = {"left": 0.06, "right": 0.98, "top": 0.92, "bottom": 0.12}
+_TOPICS_LEFT_MARGIN = 0.16
+
+
+def _configure_mpl():
+    """Apply the plotting theme once, with layout left to the fixed margins"""
+    sns.set_theme(context="notebook", style="whitegrid")
+    plt.rcParams["figure.autolayout"] = False
+
+
+_configure_mpl()
+
+# Figure shared by plots saved to PLOTS_OUTPUT_DIR without an explicit ax
+_shared_figure = {}
+
 
-def plot_sentiment_distribution(df: pd.DataFrame):
+def _get_ax():
+    """Return axes for a plot drawn without an explicit ax"""
+    # Shown plots get their own figure: non-blocking interactive backends keep
+    # every figure on screen, so clearing a shared one would erase earlier plots
+    if not config.PLOTS_OUTPUT_DIR:
+        return plt.subplots(figsize=(18, 5))[1]
+
+    # Saved plots are written out before the next one draws, so they reuse one
+    # figure, cleared, recreating it once it is closed
+    fig = _shared_figure.get("fig")
+    if fig is None or not plt.fignum_exists(fig.number):
+        fig, ax = plt.subplots(figsize=(18, 5))
+        _shared_figure["fig"], _shared_figure["ax"] = fig, ax
+        return ax
+    ax = _shared_figure["ax"]
+    ax.clear()
+    return ax
+
+
+def _render(fig, name: str, **margins):
+    """Save the figure to PLOTS_OUTPUT_DIR if configured, otherwise show it"""
+    fig.subplots_adjust(**{**_MARGINS, **margins})
+    if config.PLOTS_OUTPUT_DIR:
+        os.makedirs(config.PLOTS_OUTPUT_DIR, exist_ok=True)
+        fig.savefig(os.path.join(config.PLOTS_OUTPUT_DIR, f"{name}.png"))
+    else:
+        plt.show()
+
+
+def _prep_sentiment(df: pd.DataFrame, *columns: str) -> pd.DataFrame:
+    """Return just the given plotted columns, as float32 scores and datetimes"""
+    converters = {
+        "sentiment_score": lambda values: values.astype("float32"),
+        "date": pd.to_datetime,
+    }
+    return pd.DataFrame({column: converters[column](df[column]) for column in columns})
+
+
+def plot_sentiment_distribution(df: pd.DataFrame, ax=None):
     """Plot the distribution of sentiment scores"""
-    plt.figure(figsize=(18, 5))
-    sns.histplot(df["sentiment_score"], bins=20, kde=True)
-    plt.title("Distribution of Sentiment Scores in Cryptocurrency News")
-    plt.xlabel("Sentiment Score")
-    plt.ylabel("Number of Articles")
-    plt.axvline(x=0, color="r", linestyle="--", alpha=0.5)
-    plt.tight_layout()
-    plt.show()
+    df = _prep_sentiment(df, "sentiment_score")
+    own_ax = ax is None
+    if own_ax:
+        ax = _get_ax()
+    sns.histplot(df["sentiment_score"], bins=20, kde=True, ax=ax)
+    ax.set_title("Distribution of Sentiment Scores in Cryptocurrency News")
+    ax.set_xlabel("Sentiment Score")
+    ax.set_ylabel("Number of Articles")
+    ax.axvline(x=0, color="r", linestyle="--", alpha=0.5)
+    if own_ax:
+        _render(ax.figure, "sentiment_distribution")
+    return ax
 
 
-def plot_sentiment_over_time(df: pd.DataFrame):
+def plot_sentiment_over_time(df: pd.DataFrame, ax=None):
     """Plot sentiment scores over time"""
-    plt.figure(figsize=(18, 5))
-    plt.scatter(df["date"], df["sentiment_score"], alpha=0.6)
-    plt.title("News Sentiment Over Time")
-    plt.xlabel("Date")
-    plt.ylabel("Sentiment Score")
-    plt.axhline(y=0, color="r", linestyle="--", alpha=0.5)
-    plt.grid(True, alpha=0.3)
-    plt.tight_layout()
-    plt.show()
-
-
-def plot_top_topics(df: pd.DataFrame, top_n: int = 15):
-    """Plot the most frequent topics"""
-    # Extract all topics
-    all_topics = []
-    for topics in df["key_topics"]:
-        all_topics.extend([topic.lower().strip() for topic in topics])
-
-    # Count topic frequencies
-    topic_counts = pd.Series(all_topics).value_counts().reset_index()
-    topic_counts.columns = ["Topic", "Count"]
-    topic_counts = topic_counts.sort_values("Count", ascending=False).head(top_n)
-
-    plt.figure(figsize=(18, 5))
-    sns.barplot(x="Count", y="Topic", data=topic_counts)
-    plt.title(f"Top {top_n} Topics in Cryptocurrency News")
-    plt.xlabel("Frequency")
-    plt.ylabel("Topic")
-    plt.tight_layout()
-    plt.show()
+    df = _prep_sentiment(df, "date", "sentiment_score")
+    own_ax = ax is None
+    if own_ax:
+        ax = _get_ax()
+    if len(df) > HEXBIN_MIN_POINTS:
+        # Bin large corpora on a fixed grid instead of drawing every point
+        dates = df["date"]
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_convert(None)
+        ax.hexbin(
+            mdates.date2num(dates.to_numpy()),
+            df["sentiment_score"],
+            gridsize=(200, 50),
+            cmap="viridis",
+            mincnt=1,
+        )
+        ax.xaxis_date()
+    else:
+        ax.scatter(df["date"], df["sentiment_score"], alpha=0.6)
+    ax.set_title("News Sentiment Over Time")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Sentiment Score")
+    ax.axhline(y=0, color="r", linestyle="--", alpha=0.5)
+    ax.grid(True, alpha=0.3)
+    if own_ax:
+        _render(ax.figure, "sentiment_over_time")
+    return ax
+
+
+def plot_top_topics(
+    df: pd.DataFrame, top_n: int = 15, ax=None, topics_df: pd.DataFrame = None
+):
+    """Plot the most frequent topics (expects lower-cased, stripped topics)"""
+    # Reuse the caller's topics table when given instead of exploding df again
+    if topics_df is None:
+        topics_df = build_topics_table(df)
+    counts = topics_df["topic"].value_counts()
+    counts = counts[counts > 0].head(top_n)
+    # Plain string labels, so seaborn only draws the top categories
+    labels = counts.index.astype(str)
+    topic_counts = pd.DataFrame({"Topic": labels, "Count": counts.to_numpy()})
+
+    own_ax = ax is None
+    if own_ax:
+        ax = _get_ax()
+    sns.barplot(x="Count", y="Topic", data=topic_counts, ax=ax)
+    # Truncate only the tick labels, so topics sharing a prefix keep their own bars
+    short_labels = labels.where(
+        labels.str.len() <= TOPIC_LABEL_MAX_CHARS,
+        labels.str.slice(0, TOPIC_LABEL_MAX_CHARS - 1) + "…",
+    )
+    ax.set_yticks(range(len(short_labels)), short_labels)
+    ax.set_title(f"Top {top_n} Topics in Cryptocurrency News")
+    ax.set_xlabel("Frequency")
+    ax.set_ylabel("Topic")
+    if own_ax:
+        _render(ax.figure, "top_topics", left=_TOPICS_LEFT_MARGIN)
+    return ax